@@ -1,15 +1,20 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Request
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Request, Response, BackgroundTasks, Query
+from fastapi.responses import ORJSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.concurrency import run_in_threadpool
+from pymongo import AsyncMongoClient, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure, PyMongoError
 import os
 import logging
 from pathlib import Path
+from functools import lru_cache
 from pydantic import BaseModel, Field, EmailStr
 from typing import List, Optional, Dict
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from passlib.context import CryptContext
 import jwt
 from jwt import PyJWTError
@@ -20,6 +25,9 @@ import hmac
 import hashlib
 import sys
 import os
+import base64
+import traceback
+import orjson
 
 # Add current directory to Python path for local imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -32,8 +40,10 @@ from utils.email import (
     send_verification_email,
     send_password_reset_email, 
     send_order_confirmation_email,
-    send_shipping_update_email
+    send_shipping_update_email,
+    close_email_service
 )
+from utils.cache import TTLCache
 
 # Payment integrations
 import razorpay
@@ -44,11 +54,11 @@ load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncMongoClient(mongo_url, maxPoolSize=50, minPoolSize=5)
 db = client[os.environ['DB_NAME']]
 
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -59,6 +69,12 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
+# Frontend origins allowed to call the API (comma-separated)
+CORS_ORIGINS = os.environ.get(
+    'CORS_ORIGINS',
+    'http://localhost:3000,https://5cf1e327-b47c-4e63-8a38-5a055dc0238f.preview.emergentagent.com'
+).split(',')
+
 # Payment configurations
 STRIPE_API_KEY = os.environ.get('STRIPE_API_KEY', 'sk_test_demo_key')
 RAZORPAY_KEY_ID = os.environ.get('RAZORPAY_KEY_ID', 'rzp_test_demo_key')
@@ -67,6 +83,12 @@ RAZORPAY_WEBHOOK_SECRET = os.environ.get('RAZORPAY_WEBHOOK_SECRET', 'demo_webhoo
 
 # Initialize payment clients
 razorpay_client = razorpay.Client(auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET))
+stripe.api_key = STRIPE_API_KEY
+
+# Product listing cache, invalidated on product writes. Each worker keeps its
+# own copy, so the TTL bounds how stale other workers can be.
+PRODUCT_CACHE_TTL_SECONDS = float(os.environ.get('PRODUCT_CACHE_TTL_SECONDS', '60'))
+product_list_cache = TTLCache(ttl_seconds=PRODUCT_CACHE_TTL_SECONDS)
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -92,6 +114,16 @@ REGION_CONFIG = {
     }
 }
 
+# Demo subscription shown to users without any subscriptions yet
+DEMO_SUBSCRIPTION = {
+    "id": "demo_sub_001",
+    "plan_name": "Monthly Cookie Box",
+    "status": "active",
+    "products": ["Choco Chunk Cookies", "Almond Crunch Cookies"],
+    "monthly_price": 460,
+    "currency": "INR"
+}
+
 # Auth Models
 class User(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -231,6 +263,8 @@ class PaymentTransaction(BaseModel):
     gateway_order_id: Optional[str] = None
     gateway_payment_id: Optional[str] = None
     amount: float
+    subtotal: float = 0.0
+    tax: float = 0.0
     currency: str
     status: str = Field("initiated", description="initiated, pending, completed, failed, cancelled")
     payment_status: Optional[str] = None
@@ -356,6 +390,27 @@ class DeliveryInfo(BaseModel):
     message: str
     cutoff_time: str
 
+# Real Flint & Flours Products, seeded by /api/init-data
+SEED_PRODUCTS_PATH = ROOT_DIR / "seed_products.json"
+
+@lru_cache(maxsize=1)
+def load_sample_products() -> tuple:
+    """Load the sample product catalog, reading the seed file once per process.
+    
+    The file stores each image URL once under "images" and products refer to
+    it by key; expand those here and intern the repeated strings.
+    """
+    seed = orjson.loads(SEED_PRODUCTS_PATH.read_bytes())
+    image_urls = {key: sys.intern(url) for key, url in seed["images"].items()}
+    
+    products = []
+    for product_data in seed["products"]:
+        product_data = dict(product_data)
+        product_data["image_url"] = image_urls[product_data.pop("image")]
+        product_data["category"] = sys.intern(product_data["category"])
+        products.append(product_data)
+    return tuple(products)
+
 # Utility functions
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -419,6 +474,38 @@ def calculate_tax(subtotal: float, region: str) -> float:
     tax_rate = REGION_CONFIG[region]["tax_rate"]
     return round(subtotal * tax_rate, 2)
 
+# Product listing order used for keyset pagination
+PRODUCT_LIST_SORT = [("created_at", 1), ("id", 1)]
+
+# Product fields needed to build a ProductResponse; list queries fetch only these
+PRODUCT_LIST_FIELDS = {
+    "_id": 0,
+    "id": 1,
+    "name": 1,
+    "description": 1,
+    "category": 1,
+    "base_price": 1,
+    "image_url": 1,
+    "subscription_eligible": 1,
+    "in_stock": 1,
+    "ingredients": 1,
+    "bakers_notes": 1,
+    "created_at": 1
+}
+
+def encode_product_cursor(created_at: datetime, product_id: str) -> str:
+    """Encode the sort key of the last listed product as an opaque cursor"""
+    payload = orjson.dumps({"t": created_at.isoformat(), "i": product_id})
+    return base64.urlsafe_b64encode(payload).decode()
+
+def decode_product_cursor(cursor: str) -> tuple:
+    """Decode a cursor from encode_product_cursor into (created_at, id)"""
+    try:
+        payload = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(payload["t"]), str(payload["i"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 def get_delivery_info(region: str) -> DeliveryInfo:
     """Get delivery availability based on regional time"""
     if region not in REGION_CONFIG:
@@ -657,11 +744,26 @@ async def update_profile(
 
 # Product endpoints
 @api_router.get("/products", response_model=List[ProductResponse])
-async def get_products(region: str = "India", category: Optional[str] = None, search: Optional[str] = None):
+async def get_products(
+    region: str = "India",
+    category: Optional[str] = None,
+    search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=100)
+):
+    """List in-stock products. With limit, pages by keyset and returns the
+    next page's cursor in the X-Next-Cursor header."""
     # Validate region
     if region not in REGION_CONFIG:
         raise HTTPException(status_code=400, detail="Invalid region")
     
+    # Cache the encoded body so hits skip serialization as well as the query
+    cache_key = ("products:list", region, category, search, cursor, limit)
+    cached = product_list_cache.get(cache_key)
+    if cached is not None:
+        content, headers = cached
+        return Response(content=content, media_type="application/json", headers=headers)
+    
     # Build query
     query = {"in_stock": True}
     if category:
@@ -678,8 +780,20 @@ async def get_products(region: str = "India", category: Optional[str] = None, se
             {"bakers_notes": search_regex}
         ]
     
-    # Get products from database
-    products = await db.products.find(query).to_list(1000)
+    # Resume after the last product of the previous page
+    if cursor:
+        last_created_at, last_id = decode_product_cursor(cursor)
+        query["$and"] = [{"$or": [
+            {"created_at": {"$gt": last_created_at}},
+            {"created_at": last_created_at, "id": {"$gt": last_id}}
+        ]}]
+    
+    # limit() on the cursor so the server only returns one page, not a full first batch
+    products_cursor = db.products.find(query, PRODUCT_LIST_FIELDS).limit(limit or 1000)
+    if cursor or limit:
+        # Pages need a stable (created_at, id) order; the full list keeps insertion order
+        products_cursor = products_cursor.sort(PRODUCT_LIST_SORT)
+    products = await products_cursor.to_list(None)
     
     # Convert to response format with regional pricing
     result = []
@@ -704,7 +818,13 @@ async def get_products(region: str = "India", category: Optional[str] = None, se
             created_at=product.created_at
         ))
     
-    return result
+    headers = None
+    if limit and len(result) == limit:
+        headers = {"X-Next-Cursor": encode_product_cursor(result[-1].created_at, result[-1].id)}
+    
+    content = orjson.dumps([product.model_dump() for product in result])
+    product_list_cache.set(cache_key, (content, headers))
+    return Response(content=content, media_type="application/json", headers=headers)
 
 @api_router.get("/products/{product_id}", response_model=ProductResponse)
 async def get_product(product_id: str, region: str = "India"):
@@ -829,7 +949,11 @@ async def create_product(
     product = Product(**product_data.dict())
     
     # Save to database
-    await db.products.insert_one(product.dict())
+    try:
+        await db.products.insert_one(product.dict())
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="A product with this name already exists")
+    product_list_cache.clear()
     
     # Return with regional pricing (using India as default)
     regional_price = convert_price(product.base_price, "India")
@@ -874,10 +998,14 @@ async def update_product(
     update_data = {k: v for k, v in product_data.dict().items() if v is not None}
     update_data["updated_at"] = datetime.utcnow()
     
-    await db.products.update_one(
-        {"id": product_id},
-        {"$set": update_data}
-    )
+    try:
+        await db.products.update_one(
+            {"id": product_id},
+            {"$set": update_data}
+        )
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="A product with this name already exists")
+    product_list_cache.clear()
     
     # Return updated product
     updated_product_doc = await db.products.find_one({"id": product_id})
@@ -912,13 +1040,14 @@ async def delete_product(
     
     # Delete product
     await db.products.delete_one({"id": product_id})
+    product_list_cache.clear()
     
     return {"message": "Product deleted successfully"}
 
 @api_router.get("/admin/products", response_model=List[ProductResponse])
 async def get_all_products_admin(admin_user: User = Depends(get_admin_user)):
     # Get all products (including out of stock)
-    products = await db.products.find().to_list(1000)
+    products = await db.products.find({}, PRODUCT_LIST_FIELDS).to_list(1000)
     
     # Convert to response format
     result = []
@@ -1021,7 +1150,7 @@ async def update_order(
     
     # Prepare update data
     update_data = {k: v for k, v in order_update.dict().items() if v is not None}
-    update_data["updated_at"] = datetime.utcnow()
+    update_data["updated_at"] = datetime.now(timezone.utc)
     
     # Update order
     await db.orders.update_one(
@@ -1054,8 +1183,8 @@ async def update_order(
 async def get_admin_stats(admin_user: User = Depends(get_admin_user)):
     """Get admin dashboard statistics"""
     
-    # Count all orders
-    total_orders = await db.orders.count_documents({})
+    # Count all orders (from collection metadata, no collection scan)
+    total_orders = await db.orders.estimated_document_count()
     
     # Count orders by status
     pending_orders = await db.orders.count_documents({"order_status": "pending"})
@@ -1067,7 +1196,8 @@ async def get_admin_stats(admin_user: User = Depends(get_admin_user)):
         {"$match": {"payment_status": "completed"}},
         {"$group": {"_id": None, "total": {"$sum": "$total"}}}
     ]
-    revenue_result = await db.orders.aggregate(revenue_pipeline).to_list(1)
+    revenue_cursor = await db.orders.aggregate(revenue_pipeline)
+    revenue_result = await revenue_cursor.to_list(1)
     total_revenue = revenue_result[0]["total"] if revenue_result else 0
     
     # Calculate monthly sales (current month)
@@ -1079,7 +1209,8 @@ async def get_admin_stats(admin_user: User = Depends(get_admin_user)):
         }},
         {"$group": {"_id": None, "total": {"$sum": "$total"}}}
     ]
-    monthly_result = await db.orders.aggregate(monthly_pipeline).to_list(1)
+    monthly_cursor = await db.orders.aggregate(monthly_pipeline)
+    monthly_result = await monthly_cursor.to_list(1)
     monthly_sales = monthly_result[0]["total"] if monthly_result else 0
     
     # Count new orders (last 24 hours)
@@ -1104,7 +1235,9 @@ async def get_user_orders(
     current_user: User = Depends(get_current_user),
     status: Optional[str] = None,
     date_from: Optional[str] = None,
-    date_to: Optional[str] = None
+    date_to: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=100),
+    offset: int = Query(0, ge=0)
 ):
     """Get orders for the current user"""
     # Build query for user's orders
@@ -1123,7 +1256,7 @@ async def get_user_orders(
         query["created_at"] = date_query
     
     # Get orders
-    orders = await db.orders.find(query).sort("created_at", -1).to_list(100)
+    orders = await db.orders.find(query).sort("created_at", -1).skip(offset).limit(limit).to_list(None)
     
     # Convert to response format
     result = []
@@ -1151,22 +1284,18 @@ async def get_user_orders(
 @api_router.get("/users/subscriptions")
 async def get_user_subscriptions(current_user: User = Depends(get_current_user)):
     """Get subscriptions for the current user"""
-    try:
-        subscriptions = await db.subscriptions.find({"user_email": current_user.email}).to_list(100)
+    cursor = db.subscriptions.find({"user_email": current_user.email}, {"_id": 0}).limit(100)
+    subscriptions = [subscription async for subscription in cursor]
+    if subscriptions:
         return subscriptions
-    except Exception as e:
-        # Return demo subscription if collection doesn't exist
-        return [{
-            "id": "demo_sub_001",
-            "plan_name": "Monthly Cookie Box",
-            "status": "active",
-            "next_renewal": (datetime.utcnow() + timedelta(days=7)).isoformat(),
-            "created_at": (datetime.utcnow() - timedelta(days=30)).isoformat(),
-            "products": ["Choco Chunk Cookies", "Almond Crunch Cookies"],
-            "monthly_price": 460,
-            "currency": "INR",
-            "user_email": current_user.email
-        }]
+    
+    # Return demo subscription if the user has none yet
+    now = datetime.utcnow()
+    return [DEMO_SUBSCRIPTION | {
+        "next_renewal": (now + timedelta(days=7)).isoformat(),
+        "created_at": (now - timedelta(days=30)).isoformat(),
+        "user_email": current_user.email
+    }]
 
 @api_router.post("/subscriptions/{subscription_id}/{action}")
 async def manage_subscription(
@@ -1182,6 +1311,112 @@ async def manage_subscription(
     return {"message": f"Subscription {action} successful", "subscription_id": subscription_id}
 
 # NEW PAYMENT ENDPOINTS
+async def create_stripe_checkout(
+    transaction: PaymentTransaction,
+    cart_response: CartResponse,
+    origin: str,
+    checkout_request: CheckoutRequest
+) -> CheckoutResponse:
+    """Create Stripe checkout session for Canada using native Stripe SDK"""
+    try:
+        # Prepare line items for Stripe
+        line_items = []
+        for item in cart_response.items:
+            line_items.append({
+                'price_data': {
+                    'currency': cart_response.currency.lower(),
+                    'product_data': {
+                        'name': item.product_name,
+                    },
+                    'unit_amount': int(item.unit_price * 100),
+                },
+                'quantity': item.quantity,
+            })
+        
+        # The Stripe SDK is blocking, so keep it off the event loop
+        checkout_session = await run_in_threadpool(
+            stripe.checkout.Session.create,
+            payment_method_types=['card'],
+            line_items=line_items,
+            mode='payment',
+            success_url=f"{origin}/order-confirmation?session_id={{CHECKOUT_SESSION_ID}}&transaction_id={transaction.id}",
+            cancel_url=f"{origin}/cart?cancelled=true",
+            customer_email=checkout_request.user_email,
+            metadata={
+                "transaction_id": transaction.id,
+                "user_email": checkout_request.user_email,
+                "region": checkout_request.region
+            }
+        )
+        
+        # Update transaction with Stripe session ID
+        await db.payment_transactions.update_one(
+            {"id": transaction.id},
+            {"$set": {
+                "stripe_session_id": checkout_session.id,
+                "updated_at": datetime.utcnow()
+            }}
+        )
+        
+        return CheckoutResponse(
+            checkout_url=checkout_session.url,
+            payment_gateway=transaction.payment_gateway,
+            transaction_id=transaction.id,
+            amount=cart_response.total,
+            currency=cart_response.currency
+        )
+            
+    except Exception as e:
+        logger.error(f"Stripe checkout error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Payment processing error")
+
+async def create_razorpay_checkout(
+    transaction: PaymentTransaction,
+    cart_response: CartResponse,
+    origin: str,
+    checkout_request: CheckoutRequest
+) -> CheckoutResponse:
+    """Create Razorpay order for India"""
+    try:
+        # The Razorpay SDK is blocking, so keep it off the event loop
+        razorpay_order = await run_in_threadpool(razorpay_client.order.create, {
+            "amount": int(cart_response.total * 100),  # Amount in paise
+            "currency": cart_response.currency,
+            "receipt": transaction.id,
+            "notes": {
+                "user_email": checkout_request.user_email,
+                "region": checkout_request.region
+            }
+        })
+        
+        # Update transaction with Razorpay order ID
+        await db.payment_transactions.update_one(
+            {"id": transaction.id},
+            {"$set": {
+                "razorpay_order_id": razorpay_order["id"],
+                "updated_at": datetime.utcnow()
+            }}
+        )
+        
+        return CheckoutResponse(
+            checkout_url=f"{origin}/checkout/razorpay?order_id={razorpay_order['id']}&transaction_id={transaction.id}",
+            payment_gateway=transaction.payment_gateway,
+            transaction_id=transaction.id,
+            amount=cart_response.total,
+            currency=cart_response.currency,
+            razorpay_order_id=razorpay_order["id"]
+        )
+        
+    except Exception as e:
+        logger.error(f"Razorpay order creation error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Payment processing error")
+
+# Checkout handler per REGION_CONFIG payment_gateway
+GATEWAY_HANDLERS = {
+    "stripe": create_stripe_checkout,
+    "razorpay": create_razorpay_checkout,
+}
+
 @api_router.post("/payments/checkout", response_model=CheckoutResponse)
 async def create_checkout(checkout_request: CheckoutRequest, request: Request):
     """Create checkout session with regional payment gateway routing"""
@@ -1197,10 +1432,15 @@ async def create_checkout(checkout_request: CheckoutRequest, request: Request):
         
         # Create payment transaction record
         payment_gateway = REGION_CONFIG[checkout_request.region]["payment_gateway"]
+        handler = GATEWAY_HANDLERS.get(payment_gateway)
+        if handler is None:
+            raise HTTPException(status_code=400, detail="Unsupported payment gateway")
         
         transaction = PaymentTransaction(
             payment_gateway=payment_gateway,
             amount=cart_response.total,
+            subtotal=cart_response.subtotal,
+            tax=cart_response.tax,
             currency=cart_response.currency,
             region=checkout_request.region,
             user_email=checkout_request.user_email,
@@ -1216,100 +1456,10 @@ async def create_checkout(checkout_request: CheckoutRequest, request: Request):
         await db.payment_transactions.insert_one(transaction.dict())
         
         # Route to appropriate payment gateway
-        if payment_gateway == "stripe":
-            # Create Stripe checkout session for Canada using native Stripe SDK
-            try:
-                import stripe
-                stripe.api_key = STRIPE_API_KEY
-                
-                # Prepare line items for Stripe
-                line_items = []
-                for item in cart_response.items:
-                    line_items.append({
-                        'price_data': {
-                            'currency': cart_response.currency.lower(),
-                            'product_data': {
-                                'name': item.product_name,
-                            },
-                            'unit_amount': int(item.unit_price * 100),
-                        },
-                        'quantity': item.quantity,
-                    })
-                
-                # Create Stripe checkout session directly
-                checkout_session = stripe.checkout.Session.create(
-                    payment_method_types=['card'],
-                    line_items=line_items,
-                    mode='payment',
-                    success_url=f"{origin}/order-confirmation?session_id={{CHECKOUT_SESSION_ID}}&transaction_id={transaction.id}",
-                    cancel_url=f"{origin}/cart?cancelled=true",
-                    customer_email=checkout_request.user_email,
-                    metadata={
-                        "transaction_id": transaction.id,
-                        "user_email": checkout_request.user_email,
-                        "region": checkout_request.region
-                    }
-                )
-                
-                # Update transaction with Stripe session ID
-                await db.payment_transactions.update_one(
-                    {"id": transaction.id},
-                    {"$set": {
-                        "stripe_session_id": checkout_session.id,
-                        "updated_at": datetime.utcnow()
-                    }}
-                )
-                
-                return CheckoutResponse(
-                    checkout_url=checkout_session.url,
-                    payment_gateway=payment_gateway,
-                    transaction_id=transaction.id,
-                    amount=cart_response.total,
-                    currency=cart_response.currency
-                )
-                    
-            except Exception as e:
-                logger.error(f"Stripe checkout error: {str(e)}")
-                raise HTTPException(status_code=500, detail="Payment processing error")
-        
-        elif payment_gateway == "razorpay":
-            # Create Razorpay order for India
-            try:
-                razorpay_order = razorpay_client.order.create({
-                    "amount": int(cart_response.total * 100),  # Amount in paise
-                    "currency": cart_response.currency,
-                    "receipt": transaction.id,
-                    "notes": {
-                        "user_email": checkout_request.user_email,
-                        "region": checkout_request.region
-                    }
-                })
-                
-                # Update transaction with Razorpay order ID
-                await db.payment_transactions.update_one(
-                    {"id": transaction.id},
-                    {"$set": {
-                        "razorpay_order_id": razorpay_order["id"],
-                        "updated_at": datetime.utcnow()
-                    }}
-                )
-                
-                return CheckoutResponse(
-                    checkout_url=f"{origin}/checkout/razorpay?order_id={razorpay_order['id']}&transaction_id={transaction.id}",
-                    payment_gateway=payment_gateway,
-                    transaction_id=transaction.id,
-                    amount=cart_response.total,
-                    currency=cart_response.currency,
-                    razorpay_order_id=razorpay_order["id"]
-                )
-                
-            except Exception as e:
-                logger.error(f"Razorpay order creation error: {str(e)}")
-                raise HTTPException(status_code=500, detail="Payment processing error")
-        
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported payment gateway")
+        return await handler(transaction, cart_response, origin, checkout_request)
             
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Checkout error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1325,8 +1475,8 @@ async def get_payment_status(transaction_id: str):
     
     try:
         if transaction.payment_gateway == "stripe" and transaction.stripe_session_id:
-            # Check Stripe status using native SDK
-            session = stripe.checkout.Session.retrieve(transaction.stripe_session_id)
+            # Check Stripe status using native SDK, off the event loop
+            session = await run_in_threadpool(stripe.checkout.Session.retrieve, transaction.stripe_session_id)
             payment_status = session.payment_status
             
             # Update transaction status
@@ -1372,8 +1522,24 @@ async def get_payment_status(transaction_id: str):
             currency=transaction.currency
         )
 
+async def notify_order_confirmation(recipient_email: str, order_data: Dict):
+    """Send order confirmation email, logging instead of raising on failure"""
+    try:
+        email_result = await send_order_confirmation_email(
+            recipient_email=recipient_email,
+            order_data=order_data
+        )
+        
+        if email_result["success"]:
+            logger.info(f"Order confirmation email sent successfully to {recipient_email}")
+        else:
+            logger.error(f"Failed to send order confirmation email: {email_result.get('error')}")
+            
+    except Exception as email_error:
+        logger.error(f"Email sending error: {str(email_error)}")
+
 @api_router.post("/payments/stripe/webhook")
-async def stripe_webhook(request: Request):
+async def stripe_webhook(request: Request, background_tasks: BackgroundTasks):
     """Handle Stripe webhook events"""
     try:
         payload = await request.body()
@@ -1382,8 +1548,7 @@ async def stripe_webhook(request: Request):
         # For demo purposes, we'll process without signature verification
         # In production, add proper webhook signature verification
         
-        import json
-        event = json.loads(payload)
+        event = orjson.loads(payload)
         logger.info(f"Received Stripe webhook event: {event['type']}")
         
         if event['type'] == 'checkout.session.completed':
@@ -1400,73 +1565,86 @@ async def stripe_webhook(request: Request):
                 return {"status": "error", "message": "Transaction not found"}
             
             logger.info(f"Found transaction: {transaction['id']}")
+            now = datetime.now(timezone.utc)
             
             # Create the order
             order = Order(
                 user_email=transaction["user_email"],
                 transaction_id=transaction["id"],
                 items=transaction["cart_items"],
+                subtotal=transaction.get("subtotal", 0.0),
+                tax=transaction.get("tax", 0.0),
                 total=transaction["amount"],
                 currency=transaction["currency"],
                 region=transaction["region"],
                 delivery_address=transaction["delivery_address"],
                 order_status="confirmed",
-                payment_status="completed"
+                payment_status="completed",
+                created_at=now,
+                updated_at=now
             )
             
-            await db.orders.insert_one(order.dict())
-            logger.info(f"Order created: {order.id}")
-            
-            # Update transaction status
-            await db.payment_transactions.update_one(
-                {"id": transaction["id"]},
-                {"$set": {
-                    "status": "completed",
-                    "stripe_payment_intent": session.get('payment_intent'),
-                    "updated_at": datetime.utcnow()
-                }}
-            )
+            # Insert the order first so a transaction is only marked completed once its order exists
+            duplicate = False
+            try:
+                await db.orders.insert_one(order.dict())
+            except DuplicateKeyError:
+                duplicate = True
+            except Exception as e:
+                logger.error(f"Order creation failed for transaction {transaction['id']}: {e}")
+                # A 5xx makes Stripe redeliver the event
+                raise HTTPException(status_code=500, detail="Failed to create order")
             
-            # Send order confirmation email
+            # Idempotent, so a replay also completes a transaction whose earlier update failed
             try:
-                # Prepare order data for email
-                order_data = {
-                    "order_id": order.id,
-                    "order_date": order.created_at.strftime("%B %d, %Y at %I:%M %p"),
-                    "region": order.region,
-                    "items": [
-                        {
-                            "name": item.get("product_name", "Unknown Item"),
-                            "quantity": item.get("quantity", 1),
-                            "price": item.get("unit_price", 0)
-                        }
-                        for item in order.items
-                    ],
-                    "total": order.total,
-                    "currency": "CAD" if order.region == "Canada" else "INR",
-                    "expected_delivery": "2-3 business days"
-                }
-                
-                email_result = await send_order_confirmation_email(
-                    recipient_email=order.user_email,
-                    order_data=order_data
+                await db.payment_transactions.update_one(
+                    {"id": transaction["id"]},
+                    {"$set": {
+                        "status": "completed",
+                        "stripe_payment_intent": session.get('payment_intent'),
+                        "updated_at": now
+                    }}
                 )
-                
-                if email_result["success"]:
-                    logger.info(f"Order confirmation email sent successfully to {order.user_email}")
-                else:
-                    logger.error(f"Failed to send order confirmation email: {email_result.get('error')}")
-                    
-            except Exception as email_error:
-                logger.error(f"Email sending error: {str(email_error)}")
+            except Exception as e:
+                logger.error(f"Transaction update failed for {transaction['id']}: {e}")
+                raise HTTPException(status_code=500, detail="Failed to complete transaction")
+            
+            if duplicate:
+                logger.info(f"Duplicate webhook for transaction {transaction['id']}, ignoring")
+                return {"status": "success"}
+            logger.info(f"Order created: {order.id}")
+            
+            # Send order confirmation email after the webhook response
+            order_data = {
+                "order_id": order.id,
+                "order_date": order.created_at.strftime("%B %d, %Y at %I:%M %p"),
+                "region": order.region,
+                "items": [
+                    {
+                        "name": item.get("product_name", "Unknown Item"),
+                        "quantity": item.get("quantity", 1),
+                        "price": item.get("unit_price", 0)
+                    }
+                    for item in order.items
+                ],
+                "total": order.total,
+                "currency": "CAD" if order.region == "Canada" else "INR",
+                "expected_delivery": "2-3 business days"
+            }
+            background_tasks.add_task(
+                notify_order_confirmation,
+                recipient_email=order.user_email,
+                order_data=order_data
+            )
             
             logger.info(f"Webhook processing completed successfully for order: {order.id}")
             
         return {"status": "success"}
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Stripe webhook error: {str(e)}")
-        import traceback
         logger.error(f"Webhook traceback: {traceback.format_exc()}")
         return {"status": "error", "message": str(e)}
     """Verify Razorpay payment from frontend"""
@@ -1516,21 +1694,17 @@ async def stripe_webhook(request: Request):
 async def create_order_from_transaction(transaction: PaymentTransaction):
     """Create order from completed payment transaction"""
     try:
-        # Check if order already exists
-        existing_order = await db.orders.find_one({"transaction_id": transaction.id})
-        if existing_order:
-            return
-        
         # Calculate delivery date (tomorrow if past cutoff)
         delivery_info = get_delivery_info(transaction.region)
-        delivery_date = datetime.utcnow() + timedelta(days=1 if not delivery_info.available_today else 0)
+        now = datetime.now(timezone.utc)
+        delivery_date = now + timedelta(days=1 if not delivery_info.available_today else 0)
         
         order = Order(
             user_email=transaction.user_email or "guest@example.com",
             transaction_id=transaction.id,
             items=transaction.cart_items,
-            subtotal=transaction.amount - (transaction.amount * 0.15),  # Approximate subtotal
-            tax=transaction.amount * 0.15,  # Approximate tax
+            subtotal=transaction.subtotal,
+            tax=transaction.tax,
             total=transaction.amount,
             currency=transaction.currency,
             region=transaction.region,
@@ -1538,21 +1712,37 @@ async def create_order_from_transaction(transaction: PaymentTransaction):
             order_status="confirmed",
             payment_status="completed",
             delivery_date=delivery_date,
-            notes=transaction.metadata.get("delivery_message", "")
+            notes=transaction.metadata.get("delivery_message", ""),
+            created_at=now,
+            updated_at=now
         )
         
+        # The unique index on transaction_id (required at startup) makes this idempotent
         await db.orders.insert_one(order.dict())
         logger.info(f"Order created for transaction {transaction.id}")
         
+    except DuplicateKeyError:
+        logger.info(f"Order already exists for transaction {transaction.id}")
     except Exception as e:
         logger.error(f"Order creation error: {e}")
 
 # Order endpoints
 @api_router.get("/orders", response_model=List[OrderResponse])
-async def get_orders(current_user: User = Depends(get_current_user)):
-    """Get orders for current user"""
-    orders = await db.orders.find({"user_email": current_user.email}).to_list(1000)
-    return [OrderResponse(**order) for order in orders]
+async def get_orders(
+    current_user: User = Depends(get_current_user),
+    limit: Optional[int] = Query(None, ge=1, le=100),
+    offset: int = Query(0, ge=0)
+):
+    """Get orders for current user, newest first. Without limit, returns the
+    full history (capped at 1000) since the order page doesn't paginate."""
+    cursor = (
+        db.orders.find({"user_email": current_user.email}, {"_id": 0})
+        .sort("created_at", -1)
+        .skip(offset)
+        .limit(limit or 1000)
+    )
+    # response_model validates the output, so skip validating it twice here
+    return [OrderResponse.model_construct(**order) async for order in cursor]
 
 @api_router.get("/orders/{order_id}", response_model=OrderResponse)
 async def get_order(order_id: str, current_user: User = Depends(get_current_user)):
@@ -1564,10 +1754,57 @@ async def get_order(order_id: str, current_user: User = Depends(get_current_user
     return OrderResponse(**order_doc)
 
 # Initialize sample data
+# Fields the template keeps from the first insert, so refreshes don't churn them
+PRODUCT_TEMPLATE_INSERT_ONLY_FIELDS = ("id", "created_at")
+
+@lru_cache(maxsize=1)
+def seed_products_hash() -> str:
+    """SHA-256 of the seed file, used to tell whether products_template is stale"""
+    return hashlib.sha256(SEED_PRODUCTS_PATH.read_bytes()).hexdigest()
+
+async def ensure_products_template():
+    """Fill products_template from the seed file when it is empty or the seed file has changed"""
+    seed_hash = seed_products_hash()
+    state = await db.seed_state.find_one({"_id": "products_template"})
+    if (
+        state is not None
+        and state.get("seed_hash") == seed_hash
+        and await db.products_template.find_one({}, {"_id": 1}) is not None
+    ):
+        return
+    
+    # Seed data is trusted, so fill in defaults without running validation
+    operations = []
+    for product_data in load_sample_products():
+        doc = Product.model_construct(**product_data).model_dump()
+        on_insert = {field: doc.pop(field) for field in PRODUCT_TEMPLATE_INSERT_ONLY_FIELDS}
+        operations.append(UpdateOne(
+            {"name": doc["name"]},
+            {"$set": doc, "$setOnInsert": on_insert},
+            upsert=True
+        ))
+    
+    try:
+        await db.products_template.bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        write_errors = e.details.get("writeErrors", [])
+        if not write_errors or any(error.get("code") != 11000 for error in write_errors):
+            logger.error(f"Failed to refresh products_template: {e.details}")
+            return
+        # Another worker upserted the same names concurrently; its writes carry the same seed
+        logger.info("products_template already refreshed by another worker")
+    
+    await db.seed_state.update_one(
+        {"_id": "products_template"},
+        {"$set": {"seed_hash": seed_hash, "updated_at": datetime.utcnow()}},
+        upsert=True
+    )
+
 @api_router.post("/clear-products")
 async def clear_products():
     """Clear all products from database"""
     await db.products.delete_many({})
+    product_list_cache.clear()
     return {"message": "All products cleared"}
 
 @api_router.post("/init-data")
@@ -1657,563 +1894,34 @@ async def initialize_sample_data():
         if not existing_order:
             await db.orders.insert_one(order.dict())
     
-    # Real Flint & Flours Products
-    sample_products = [
-        # SLICE BREADS
-        {
-            "name": "Jowar Bread",
-            "description": "Nutritious jowar bread, perfect for daily consumption. Available in 500g and 240g sizes.",
-            "category": "breads",
-            "base_price": 150.0,  # 500g price
-            "image_url": "https://images.unsplash.com/photo-1509440159596-0249088772ff",
-            "subscription_eligible": True,
-            "ingredients": ["Jowar flour", "Yeast", "Salt", "Water", "Natural preservatives"],
-            "bakers_notes": "Made with premium jowar flour. 500g: ₹150, 240g: ₹80. Great source of protein and fiber."
-        },
-        {
-            "name": "Multigrain Bread",
-            "description": "Healthy blend of jowar, bajra, and nachni. Packed with nutrients and flavor.",
-            "category": "breads",
-            "base_price": 155.0,  # 500g price
-            "image_url": "https://images.unsplash.com/photo-1586444248902-2f64eddc13df",
-            "subscription_eligible": True,
-            "ingredients": ["Jowar flour", "Bajra flour", "Nachni flour", "Yeast", "Salt", "Water"],
-            "bakers_notes": "Power-packed with three ancient grains. 500g: ₹155, 240g: ₹85"
-        },
-        {
-            "name": "Oats Bread",
-            "description": "Wholesome combination of oats and jowar for a heart-healthy option.",
-            "category": "breads",
-            "base_price": 175.0,  # 500g price
-            "image_url": "https://images.unsplash.com/photo-1509440159596-0249088772ff",
-            "subscription_eligible": True,
-            "ingredients": ["Oats", "Jowar flour", "Yeast", "Salt", "Water"],
-            "bakers_notes": "Rich in fiber and beta-glucan. 500g: ₹175, 240g: ₹92"
-        },
-        {
-            "name": "High Protein Bread",
-            "description": "Protein-rich bread with sprouted moong and jowar for health enthusiasts.",
-            "category": "breads",
-            "base_price": 175.0,  # 500g price
-            "image_url": "https://images.unsplash.com/photo-1509440159596-0249088772ff",
-            "subscription_eligible": True,
-            "ingredients": ["Sprouted moong", "Jowar flour", "Yeast", "Salt", "Water"],
-            "bakers_notes": "Perfect for fitness enthusiasts. 500g: ₹175, 240g: ₹92"
-        },
-        {
-            "name": "Quinoa Bread",
-            "description": "Premium quinoa bread with complete protein profile and exceptional taste.",
-            "category": "breads",
-            "base_price": 200.0,  # 500g price
-            "image_url": "https://images.unsplash.com/photo-1509440159596-0249088772ff",
-            "subscription_eligible": True,
-            "ingredients": ["Quinoa flour", "Whole wheat flour", "Yeast", "Salt", "Water"],
-            "bakers_notes": "Superfood bread with all 9 essential amino acids. 500g: ₹200, 240g: ₹110"
-        },
-        
-        # OTHER BREADS
-        {
-            "name": "Pizza Base",
-            "description": "Fresh pizza base ready for your favorite toppings. 8 inch diameter, 2 pieces.",
-            "category": "breads",
-            "base_price": 100.0,
-            "image_url": "https://images.unsplash.com/photo-1513104890138-7c749659a591",
-            "subscription_eligible": False,
-            "ingredients": ["Refined flour", "Yeast", "Olive oil", "Salt", "Sugar"],
-            "bakers_notes": "Hand-stretched dough. 140g (8 inch, 2 pc): ₹100"
-        },
-        {
-            "name": "Pav (Dinner Rolls)",
-            "description": "Soft and fluffy dinner rolls, perfect for vada pav or sandwiches.",
-            "category": "breads",
-            "base_price": 105.0,  # 440g price
-            "image_url": "https://images.unsplash.com/photo-1549931319-a545dcf3bc73",
-            "subscription_eligible": True,
-            "ingredients": ["Refined flour", "Yeast", "Milk", "Butter", "Sugar", "Salt"],
-            "bakers_notes": "Mumbai-style soft pav. 440g (8 pc): ₹105, 220g (4 pc): ₹60"
-        },
-        {
-            "name": "Burger Buns",
-            "description": "Artisan burger buns available in plain, seeded, herb, and garlic varieties.",
-            "category": "breads",
-            "base_price": 100.0,
-            "image_url": "https://images.unsplash.com/photo-1571091718767-18b5b1457add",
-            "subscription_eligible": False,
-            "ingredients": ["Refined flour", "Yeast", "Eggs", "Butter", "Sesame seeds"],
-            "bakers_notes": "140g (2 pc): ₹100. Available in plain/seeded/herb/garlic"
-        },
-        {
-            "name": "Sourdough Bread",
-            "description": "Traditional sourdough with tangy flavor and perfect crust. Plain, seeded, or jalapeño.",
-            "category": "breads",
-            "base_price": 400.0,  # 500g price
-            "image_url": "https://images.pexels.com/photos/745988/pexels-photo-745988.jpeg",
-            "subscription_eligible": True,
-            "ingredients": ["Sourdough starter", "Flour", "Water", "Salt"],
-            "bakers_notes": "Fermented for 24 hours. 500g: ₹400, 300g: ₹240"
-        },
-        
-        # KULCHAS
-        {
-            "name": "Amritsari Kulcha",
-            "description": "Authentic Amritsari-style kulcha with traditional filling and flavors.",
-            "category": "breads", 
-            "base_price": 170.0,
-            "image_url": "https://images.unsplash.com/photo-1626132647523-66f6bf7add1e",
-            "subscription_eligible": False,
-            "ingredients": ["Refined flour", "Yogurt", "Potato filling", "Spices", "Onions"],
-            "bakers_notes": "Authentic Punjab recipe. 220g (2 pc): ₹170"
-        },
-        
-        # COOKIES
-        {
-            "name": "Choco Chunk Cookies",
-            "description": "Rich chocolate chunk cookies made with premium chocolate pieces.",
-            "category": "cookies",
-            "base_price": 230.0,
-            "image_url": "https://images.unsplash.com/photo-1590080874088-eec64895b423",
-            "subscription_eligible": True,
-            "ingredients": ["Flour", "Butter", "Chocolate chunks", "Brown sugar", "Eggs"],
-            "bakers_notes": "200g pack. Hand-rolled and baked fresh daily."
-        },
-        {
-            "name": "Cranberry Pistachio Cookies",
-            "description": "Delightful combination of tangy cranberries and crunchy pistachios.",
-            "category": "cookies",
-            "base_price": 230.0,
-            "image_url": "https://images.unsplash.com/photo-1558961363-fa8fdf82db35",
-            "subscription_eligible": True,
-            "ingredients": ["Flour", "Butter", "Dried cranberries", "Pistachios", "Sugar"],
-            "bakers_notes": "200g pack. Perfect balance of sweet and tart flavors."
-        },
-        {
-            "name": "Almond Crunch Cookies",
-            "description": "Crunchy cookies loaded with premium almonds for that perfect bite.",
-            "category": "cookies",
-            "base_price": 230.0,
-            "image_url": "https://images.unsplash.com/photo-1485893086445-ed75865251e0",
-            "subscription_eligible": True,
-            "ingredients": ["Flour", "Butter", "Almonds", "Brown sugar", "Vanilla"],
-            "bakers_notes": "200g pack. Made with California almonds."
-        },
-        
-        # MUFFINS
-        {
-            "name": "Choco Chip Muffins",
-            "description": "Fluffy muffins studded with chocolate chips, perfect for breakfast or snacking.",
-            "category": "cakes",
-            "base_price": 100.0,
-            "image_url": "https://images.unsplash.com/photo-1607958996333-41aef7caefaa",
-            "subscription_eligible": False,
-            "ingredients": ["Flour", "Chocolate chips", "Eggs", "Milk", "Butter", "Sugar"],
-            "bakers_notes": "120g each. Baked fresh every morning."
-        },
-        {
-            "name": "Blueberry Muffins",
-            "description": "Soft, moist muffins bursting with fresh blueberries and citrus notes.",
-            "category": "cakes",
-            "base_price": 100.0,
-            "image_url": "https://images.unsplash.com/photo-1607958996333-41aef7caefaa",
-            "subscription_eligible": False,
-            "ingredients": ["Flour", "Fresh blueberries", "Eggs", "Milk", "Lemon zest"],
-            "bakers_notes": "120g each. Made with imported blueberries."
-        },
-        
-        # CAKES
-        {
-            "name": "Chocolate Cake",
-            "description": "Rich, decadent chocolate cake made with premium cocoa and layered with ganache.",
-            "category": "cakes",
-            "base_price": 1300.0,
-            "image_url": "https://images.pexels.com/photos/291528/pexels-photo-291528.jpeg",
-            "subscription_eligible": False,
-            "ingredients": ["Premium cocoa", "Dark chocolate", "Eggs", "Flour", "Fresh cream"],
-            "bakers_notes": "500g cake. Order 24 hours in advance."
-        },
-        {
-            "name": "Tiramisu Cake",
-            "description": "Classic Italian tiramisu with finger cookies, coffee, and mascarpone layers.",
-            "category": "cakes",
-            "base_price": 1500.0,
-            "image_url": "https://images.unsplash.com/photo-1571877227200-a0d98ea607e9",
-            "subscription_eligible": False,
-            "ingredients": ["Mascarpone", "Finger cookies", "Coffee", "Cocoa powder", "Eggs"],
-            "bakers_notes": "500g with finger cookies. Authentic Italian recipe."
-        },
-        
-        # CROISSANTS
-        {
-            "name": "Plain Croissants",
-            "description": "Classic French croissants with buttery, flaky layers and golden crust.",
-            "category": "breads",
-            "base_price": 170.0,
-            "image_url": "https://images.unsplash.com/photo-1555507036-ab794f4ade50",
-            "subscription_eligible": False,
-            "ingredients": ["Flour", "Butter", "Yeast", "Milk", "Eggs", "Salt"],
-            "bakers_notes": "70g each. Laminated dough with 81 layers."
-        },
-        {
-            "name": "Chocolate Croissants",
-            "description": "French croissants filled with rich chocolate, perfect for breakfast treats.",
-            "category": "breads",
-            "base_price": 200.0,
-            "image_url": "https://images.unsplash.com/photo-1555507036-ab794f4ade50",
-            "subscription_eligible": False,
-            "ingredients": ["Flour", "Butter", "Dark chocolate", "Yeast", "Milk", "Eggs"],
-            "bakers_notes": "90g each. Pain au chocolat style with premium chocolate."
-        },
-        
-        # BROWNIES
-        {
-            "name": "Classic Brownies",
-            "description": "Fudgy, rich brownies with the perfect balance of chocolate and sweetness.",
-            "category": "cakes",
-            "base_price": 100.0,
-            "image_url": "https://images.unsplash.com/photo-1624353365286-3f8d62daad51",
-            "subscription_eligible": False,
-            "ingredients": ["Dark chocolate", "Butter", "Eggs", "Flour", "Cocoa powder"],
-            "bakers_notes": "90g piece. Available in plain, choco chip, walnut, and assorted varieties."
-        },
-        
-        # QUICK BITES
-        {
-            "name": "Vada Pav",
-            "description": "Mumbai's favorite street food - spiced potato fritter in soft pav with chutneys.",
-            "category": "snacks",
-            "base_price": 60.0,
-            "image_url": "https://images.unsplash.com/photo-1606491956689-2ea866880c84",
-            "subscription_eligible": False,
-            "ingredients": ["Potatoes", "Gram flour", "Spices", "Pav", "Chutneys"],
-            "bakers_notes": "Per piece: ₹60, with chutney: ₹70. Made fresh to order."
-        },
-        {
-            "name": "Mexican Puff",
-            "description": "Crispy puff pastry filled with spiced Mexican-style vegetables and beans.",
-            "category": "snacks",
-            "base_price": 60.0,
-            "image_url": "https://images.unsplash.com/photo-1565299624946-b28f40a0ca4b",
-            "subscription_eligible": False,
-            "ingredients": ["Puff pastry", "Mexican beans", "Vegetables", "Spices", "Cheese"],
-            "bakers_notes": "Per piece: ₹60, with salsa: ₹70. Baked fresh daily."
-        },
-        {
-            "name": "Homestyle Artisan Loaves",
-            "description": "Handcrafted bread loaves made with traditional methods and finest ingredients",
-            "category": "breads",
-            "base_price": 180.0,
-            "image_url": "https://images.pexels.com/photos/263168/pexels-photo-263168.jpeg",
-            "subscription_eligible": True,
-            "ingredients": ["Organic wheat", "Natural yeast", "Olive oil", "Honey", "Himalayan salt"],
-            "bakers_notes": "Shaped by hand and baked in our wood-fired oven for that authentic rustic flavor."
-        },
-        
-        # MORE COOKIES
-        {
-            "name": "Mix Nut Cookies",
-            "description": "Cookies packed with assorted nuts for the perfect crunch.",
-            "category": "cookies",
-            "base_price": 230.0,
-            "image_url": "https://images.unsplash.com/photo-1485893086445-ed75865251e0",
-            "subscription_eligible": True,
-            "ingredients": ["Flour", "Mixed nuts", "Butter", "Sugar", "Vanilla"],
-            "bakers_notes": "200g pack with almonds, cashews, and walnuts."
-        },
-        {
-            "name": "Coconut Cookies",
-            "description": "Tropical coconut cookies with rich coconut flavor.",
-            "category": "cookies",
-            "base_price": 230.0,
-            "image_url": "https://images.unsplash.com/photo-1485893086445-ed75865251e0",
-            "subscription_eligible": True,
-            "ingredients": ["Flour", "Coconut", "Butter", "Sugar", "Eggs"],
-            "bakers_notes": "200g pack. Made with fresh coconut."
-        },
-        {
-            "name": "Red Velvet Cookies",
-            "description": "Rich red velvet cookies with cream cheese flavor.",
-            "category": "cookies",
-            "base_price": 230.0,
-            "image_url": "https://images.unsplash.com/photo-1485893086445-ed75865251e0",
-            "subscription_eligible": True,
-            "ingredients": ["Flour", "Cocoa", "Red coloring", "Cream cheese", "Butter"],
-            "bakers_notes": "200g pack. Classic red velvet taste."
-        },
-        
-        # MORE MUFFINS
-        {
-            "name": "Vanilla Muffins",
-            "description": "Classic vanilla muffins, light and fluffy.",
-            "category": "cakes",
-            "base_price": 80.0,
-            "image_url": "https://images.unsplash.com/photo-1607958996333-41aef7caefaa",
-            "subscription_eligible": False,
-            "ingredients": ["Flour", "Vanilla", "Eggs", "Milk", "Butter"],
-            "bakers_notes": "120g each. Simple and delicious."
-        },
-        {
-            "name": "Almond Muffins",
-            "description": "Delicate almond-flavored muffins with crunchy almonds.",
-            "category": "cakes",
-            "base_price": 100.0,
-            "image_url": "https://images.unsplash.com/photo-1607958996333-41aef7caefaa",
-            "subscription_eligible": False,
-            "ingredients": ["Almond flour", "Almonds", "Eggs", "Milk", "Butter"],
-            "bakers_notes": "120g each. Premium almond flavor."
-        },
-        
-        # BAR CAKES
-        {
-            "name": "Choco Chip Bar Cake",
-            "description": "Moist bar cake loaded with chocolate chips.",
-            "category": "cakes",
-            "base_price": 300.0,
-            "image_url": "https://images.unsplash.com/photo-1571877227200-a0d98ea607e9",
-            "subscription_eligible": False,
-            "ingredients": ["Flour", "Chocolate chips", "Eggs", "Butter", "Sugar"],
-            "bakers_notes": "300g bar cake. Perfect for sharing."
-        },
-        {
-            "name": "Banana Walnut Bar Cake",
-            "description": "Classic banana walnut combination in bar cake form.",
-            "category": "cakes",
-            "base_price": 300.0,
-            "image_url": "https://images.unsplash.com/photo-1571877227200-a0d98ea607e9",
-            "subscription_eligible": False,
-            "ingredients": ["Bananas", "Walnuts", "Flour", "Eggs", "Butter"],
-            "bakers_notes": "300g with fresh bananas and premium walnuts."
-        },
-        
-        # MORE CAKES
-        {
-            "name": "Pineapple Cake",
-            "description": "Fresh pineapple cake with tropical flavors.",
-            "category": "cakes",
-            "base_price": 950.0,
-            "image_url": "https://images.pexels.com/photos/291528/pexels-photo-291528.jpeg",
-            "subscription_eligible": False,
-            "ingredients": ["Fresh pineapple", "Flour", "Eggs", "Cream", "Sugar"],
-            "bakers_notes": "500g cake with real pineapple pieces."
-        },
-        {
-            "name": "Baked Cheese Cake",
-            "description": "Classic New York style baked cheesecake.",
-            "category": "cakes",
-            "base_price": 1300.0,
-            "image_url": "https://images.unsplash.com/photo-1571877227200-a0d98ea607e9",
-            "subscription_eligible": False,
-            "ingredients": ["Cream cheese", "Eggs", "Graham crackers", "Butter", "Sugar"],
-            "bakers_notes": "500g authentic New York recipe."
-        },
-        
-        # MORE BREADS
-        {
-            "name": "Mini Pizza",
-            "description": "Mini pizza bases perfect for party snacks.",
-            "category": "breads",
-            "base_price": 150.0,
-            "image_url": "https://images.unsplash.com/photo-1513104890138-7c749659a591",
-            "subscription_eligible": False,
-            "ingredients": ["Refined flour", "Yeast", "Olive oil", "Salt"],
-            "bakers_notes": "240g (4 inch diameter, 6 pc): ₹150"
-        },
-        {
-            "name": "Bagels",
-            "description": "Traditional bagels with perfect chewy texture.",
-            "category": "breads",
-            "base_price": 200.0,
-            "image_url": "https://images.unsplash.com/photo-1555507036-ab794f4ade50",
-            "subscription_eligible": False,
-            "ingredients": ["Bread flour", "Yeast", "Malt", "Salt", "Water"],
-            "bakers_notes": "200g (2 pc): ₹200. Boiled then baked."
-        },
-        
-        # SNACKS
-        {
-            "name": "Jowar Masala Khakra",
-            "description": "Crispy jowar khakra with traditional masala spices.",
-            "category": "snacks",
-            "base_price": 175.0,
-            "image_url": "https://images.unsplash.com/photo-1606491956689-2ea866880c84",
-            "subscription_eligible": True,
-            "ingredients": ["Jowar flour", "Spices", "Oil", "Salt"],
-            "bakers_notes": "250g pack. Traditional Gujarat recipe."
-        },
-        {
-            "name": "Yellow Banana Chips",
-            "description": "Crispy banana chips made from fresh bananas.",
-            "category": "snacks",
-            "base_price": 180.0,
-            "image_url": "https://images.unsplash.com/photo-1606491956689-2ea866880c84",
-            "subscription_eligible": True,
-            "ingredients": ["Raw bananas", "Coconut oil", "Salt"],
-            "bakers_notes": "200g pack. Kerala-style preparation."
-        },
-        
-        # MORE QUICK BITES
-        {
-            "name": "Dabeli",
-            "description": "Kutchi dabeli with sweet and tangy flavors.",
-            "category": "snacks",
-            "base_price": 60.0,
-            "image_url": "https://images.unsplash.com/photo-1606491956689-2ea866880c84",
-            "subscription_eligible": False,
-            "ingredients": ["Pav", "Potatoes", "Chutneys", "Sev", "Pomegranate"],
-            "bakers_notes": "Per piece: ₹60, with chutney: ₹70"
-        },
-        
-        # BREAD-STICKS
-        {
-            "name": "Herb Bread Sticks",
-            "description": "Crispy bread sticks with aromatic herbs.",
-            "category": "breads",
-            "base_price": 200.0,
-            "image_url": "https://images.unsplash.com/photo-1509440159596-0249088772ff",
-            "subscription_eligible": False,
-            "ingredients": ["Flour", "Herbs", "Olive oil", "Yeast", "Salt"],
-            "bakers_notes": "200g pack. Perfect with soups and salads."
-        },
-        
-        # LAVASH
-        {
-            "name": "Beetroot Lavash",
-            "description": "Colorful beetroot lavash with natural pink color.",
-            "category": "breads",
-            "base_price": 200.0,
-            "image_url": "https://images.unsplash.com/photo-1509440159596-0249088772ff",
-            "subscription_eligible": False,
-            "ingredients": ["Beetroot", "Flour", "Water", "Salt", "Oil"],
-            "bakers_notes": "150g. Natural beetroot color and flavor."
-        },
-        {
-            "name": "Spinach Garlic Lavash",
-            "description": "Healthy spinach lavash with garlic flavor.",
-            "category": "breads",
-            "base_price": 200.0,
-            "image_url": "https://images.unsplash.com/photo-1509440159596-0249088772ff",
-            "subscription_eligible": False,
-            "ingredients": ["Spinach", "Garlic", "Flour", "Water", "Salt"],
-            "bakers_notes": "150g. Packed with nutrients."
-        },
-        
-        # TOAST/RUSK
-        {
-            "name": "Salted Toast",
-            "description": "Crispy salted toast perfect for tea time.",
-            "category": "breads",
-            "base_price": 180.0,
-            "image_url": "https://images.unsplash.com/photo-1509440159596-0249088772ff",
-            "subscription_eligible": True,
-            "ingredients": ["Bread", "Salt", "Oil"],
-            "bakers_notes": "200g pack. Double-baked for crispiness."
-        },
-        {
-            "name": "Sweet Rusk",
-            "description": "Mildly sweet rusk, perfect with tea or coffee.",
-            "category": "breads",
-            "base_price": 180.0,
-            "image_url": "https://images.unsplash.com/photo-1509440159596-0249088772ff",
-            "subscription_eligible": True,
-            "ingredients": ["Bread", "Sugar", "Cardamom"],
-            "bakers_notes": "200g pack. Traditional recipe."
-        },
-        
-        # BISCOTTI
-        {
-            "name": "Almond Biscotti",
-            "description": "Traditional Italian almond biscotti, twice-baked for perfect crunch.",
-            "category": "cookies",
-            "base_price": 250.0,
-            "image_url": "https://images.unsplash.com/photo-1485893086445-ed75865251e0",
-            "subscription_eligible": True,
-            "ingredients": ["Almonds", "Flour", "Eggs", "Sugar", "Vanilla"],
-            "bakers_notes": "200g pack. Authentic Italian recipe."
-        },
-        
-        # COTTON CAKES
-        {
-            "name": "Orange Pistachio Cotton Cake",
-            "description": "Light and fluffy cotton cake with orange and pistachio.",
-            "category": "cakes",
-            "base_price": 200.0,
-            "image_url": "https://images.unsplash.com/photo-1571877227200-a0d98ea607e9",
-            "subscription_eligible": False,
-            "ingredients": ["Orange", "Pistachios", "Flour", "Eggs", "Cream"],
-            "bakers_notes": "200g. Japanese-style cotton cake."
-        },
-        {
-            "name": "Chocolate Cotton Cake",
-            "description": "Ultra-light chocolate cotton cake with airy texture.",
-            "category": "cakes",
-            "base_price": 200.0,
-            "image_url": "https://images.unsplash.com/photo-1571877227200-a0d98ea607e9",
-            "subscription_eligible": False,
-            "ingredients": ["Chocolate", "Flour", "Eggs", "Cream", "Cocoa"],
-            "bakers_notes": "200g. Incredibly soft and light."
-        },
-        
-        # MORE KULCHAS
-        {
-            "name": "Plain Kulcha",
-            "description": "Simple, soft kulcha bread perfect with curries.",
-            "category": "breads",
-            "base_price": 135.0,
-            "image_url": "https://images.unsplash.com/photo-1626132647523-66f6bf7add1e",
-            "subscription_eligible": False,
-            "ingredients": ["Refined flour", "Yogurt", "Yeast", "Salt"],
-            "bakers_notes": "140g (2 pc): ₹135"
-        },
-        {
-            "name": "Pyaz da Kulcha",
-            "description": "Onion kulcha with caramelized onions and spices.",
-            "category": "breads",
-            "base_price": 170.0,
-            "image_url": "https://images.unsplash.com/photo-1626132647523-66f6bf7add1e",
-            "subscription_eligible": False,
-            "ingredients": ["Refined flour", "Onions", "Spices", "Yogurt"],
-            "bakers_notes": "220g (2 pc): ₹170. Punjab specialty."
-        },
-        
-        # MORE SNACKS - KHAKRAS
-        {
-            "name": "Moong Dal Masala Khakra",
-            "description": "Protein-rich moong dal khakra with masala spices.",
-            "category": "snacks",
-            "base_price": 200.0,
-            "image_url": "https://images.unsplash.com/photo-1606491956689-2ea866880c84",
-            "subscription_eligible": True,
-            "ingredients": ["Moong dal", "Spices", "Oil", "Salt"],
-            "bakers_notes": "250g pack. High protein snack."
-        },
-        
-        # MORE SNACKS - CHIPS  
-        {
-            "name": "Pepper Banana Chips",
-            "description": "Spicy pepper-flavored banana chips.",
-            "category": "snacks",
-            "base_price": 180.0,
-            "image_url": "https://images.unsplash.com/photo-1606491956689-2ea866880c84",
-            "subscription_eligible": True,
-            "ingredients": ["Raw bananas", "Black pepper", "Oil", "Salt"],
-            "bakers_notes": "200g pack. Kerala spices."
-        },
-        {
-            "name": "Soya Chips",
-            "description": "Healthy soya chips packed with protein.",
-            "category": "snacks",
-            "base_price": 180.0,
-            "image_url": "https://images.unsplash.com/photo-1606491956689-2ea866880c84",
-            "subscription_eligible": True,
-            "ingredients": ["Soya", "Spices", "Oil", "Salt"],
-            "bakers_notes": "200g pack. High protein snack."
-        }
-    ]
-    
-    # Create products if they don't exist
-    existing_products = await db.products.count_documents({})
-    if existing_products == 0:
-        for product_data in sample_products:
-            product = Product(**product_data)
-            await db.products.insert_one(product.dict())
+    # Create products if the catalog is empty by copying products_template
+    # server-side; merging on the unique name index makes this safe to re-run
+    # and to race with other workers
+    if await db.products.find_one({}, {"_id": 1}) is None:
+        try:
+            await db.command({
+                "aggregate": "products_template",
+                "pipeline": [
+                    {"$project": {"_id": 0}},
+                    {"$merge": {
+                        "into": "products",
+                        "on": "name",
+                        "whenMatched": "keepExisting",
+                        "whenNotMatched": "insert"
+                    }}
+                ],
+                "cursor": {}
+            })
+        except OperationFailure as e:
+            # $merge needs the unique products.name index; copy client-side if it is missing
+            logger.warning(f"$merge into products failed, inserting from products_template instead: {e}")
+            docs = await db.products_template.find({}, {"_id": 0}).to_list(None)
+            try:
+                await db.products.insert_many(docs, ordered=False)
+            except BulkWriteError:
+                # Another worker inserted the same products concurrently
+                logger.info("products already populated")
+        product_list_cache.clear()
     
     return {"message": "Sample data initialized successfully"}
 
@@ -2258,20 +1966,80 @@ async def status_check():
 # Include the router in the main app
 app.include_router(api_router)
 
+# Compress larger JSON payloads such as the product catalog
+app.add_middleware(GZipMiddleware, minimum_size=500, compresslevel=5)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=CORS_ORIGINS,
+    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_headers=["Authorization", "Content-Type"],
+    expose_headers=["X-Next-Cursor"],
+    max_age=86400,  # Let browsers cache preflight responses for a day
 )
 
-# Configure logging
+# Configure logging. The format doesn't use thread/process fields, so skip
+# collecting them for every record.
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
+# One order per payment transaction, so replayed webhooks can't duplicate orders.
+# Order creation relies on this index alone, so startup fails without it
+ORDERS_TRANSACTION_INDEX = ("orders", [("transaction_id", 1)], {"unique": True, "sparse": True})
+
+# MongoDB indexes ensured at startup: (collection, keys, options)
+DB_INDEXES = [
+    ORDERS_TRANSACTION_INDEX,
+    ("orders", [("user_email", 1), ("created_at", -1)], {}),
+    ("payment_transactions", [("stripe_session_id", 1)], {"unique": True, "sparse": True}),
+    ("products", [("name", 1)], {"unique": True}),
+    ("products_template", [("name", 1)], {"unique": True}),
+    ("products", [("created_at", 1), ("id", 1)], {}),
+]
+
+async def dedupe_orders_by_transaction():
+    """Delete duplicate orders left by replayed webhooks, keeping the earliest per transaction"""
+    duplicates_cursor = await db.orders.aggregate([
+        {"$match": {"transaction_id": {"$exists": True}}},
+        {"$sort": {"created_at": 1}},
+        {"$group": {"_id": "$transaction_id", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}}
+    ])
+    extra_ids = []
+    async for group in duplicates_cursor:
+        extra_ids.extend(group["ids"][1:])
+    
+    if extra_ids:
+        result = await db.orders.delete_many({"_id": {"$in": extra_ids}})
+        logger.warning(f"Deleted {result.deleted_count} duplicate orders before building the transaction_id index")
+
+@app.on_event("startup")
+async def create_db_indexes():
+    # Databases from before the unique index can hold replayed duplicates that block it
+    await dedupe_orders_by_transaction()
+    
+    for index in DB_INDEXES:
+        collection, keys, options = index
+        try:
+            await db[collection].create_index(keys, **options)
+        except OperationFailure as e:
+            if index is ORDERS_TRANSACTION_INDEX:
+                raise RuntimeError(f"Cannot start without the unique transaction_id index on orders: {e}") from e
+            logger.error(f"Failed to create index {keys} on {collection}: {e}")
+    
+    # Pick up edits to seed_products.json; products already in the catalog are left as they are
+    try:
+        await ensure_products_template()
+    except PyMongoError as e:
+        logger.error(f"Failed to fill products_template: {e}")
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
+    await client.close()
+    await close_email_service()
@@ -4,15 +4,71 @@ Handles all transactional emails with proper error handling and logging
 """
 
 import os
+import asyncio
 import logging
-from typing import Optional, Dict, Any
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail, From, To, Subject, HtmlContent, Content
-from python_http_client.exceptions import HTTPError
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple
+import httpx
+import orjson
+from tenacity import (
+    AsyncRetrying,
+    before_sleep_log,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_exponential_jitter
+)
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from markupsafe import escape
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
+SENDGRID_SEND_URL = "https://api.sendgrid.com/v3/mail/send"
+
+# Cap in-flight sends so bursts from concurrent handlers don't trip SendGrid's
+# rate limits; dropped connections, 429s and 5xx are retried with a short,
+# jittered exponential backoff
+send_gate = asyncio.Semaphore(int(os.getenv("SENDGRID_MAX_CONCURRENCY", "20")))
+SENDGRID_MAX_ATTEMPTS = 3
+
+def is_retryable_send_error(error: BaseException) -> bool:
+    """Retry transport failures, rate limits and SendGrid server errors"""
+    if isinstance(error, httpx.HTTPStatusError):
+        status_code = error.response.status_code
+        return status_code == 429 or status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+# SendGrid accepts at most this many personalizations per mail/send request
+SENDGRID_MAX_PERSONALIZATIONS = 1000
+
+# Email bodies live in Jinja templates; the environment compiles each one once
+# and keeps it cached for every later render
+TEMPLATES_DIR = Path(__file__).parent / "email_templates"
+template_env = Environment(
+    loader=FileSystemLoader(TEMPLATES_DIR),
+    autoescape=select_autoescape(["html"]),
+    auto_reload=False
+)
+
+# Subjects that don't vary per message
+VERIFICATION_SUBJECT = "Welcome to Flint & Flours - Verify Your Email"
+PASSWORD_RESET_SUBJECT = "Reset Your Flint & Flours Password"
+SHIPPING_UPDATE_SUBJECT = "Your Order is On Its Way! - Flint & Flours"
+
+# Placeholder rendered into link-only templates so they can be split around it
+LINK_SENTINEL = "\x00link\x00"
+
+@lru_cache(maxsize=None)
+def link_email_skeleton(template_name: str, variable: str) -> Tuple[str, ...]:
+    """Render a template whose only input is a link once, split around that link"""
+    html = template_env.get_template(template_name).render(**{variable: LINK_SENTINEL})
+    return tuple(html.split(LINK_SENTINEL))
+
+def render_link_email(template_name: str, variable: str, link: str) -> str:
+    """Fill a cached link skeleton, escaping the link as the template would"""
+    return str(escape(link)).join(link_email_skeleton(template_name, variable))
+
 class EmailService:
     def __init__(self):
         self.api_key = os.getenv('SENDGRID_API_KEY')
@@ -25,9 +81,46 @@ class EmailService:
         if not self.from_email:
             logger.error("SENDGRID_FROM_EMAIL environment variable not set")
             raise ValueError("SendGrid from email is required")
+        
+        # Sender block is the same for every message this service sends
+        self.sender = {"email": self.from_email, "name": "Flint & Flours"}
             
-        self.sg = SendGridAPIClient(api_key=self.api_key)
-        logger.info(f"EmailService initialized with from_email: {self.from_email}")
+        # One pooled client for all sends, so calls don't block the event loop
+        # and reuse connections to SendGrid
+        self._client = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(10.0),
+            # Keep idle connections longer than httpx's 5s default so sporadic
+            # transactional sends still find a warm TLS connection
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=30.0),
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            }
+        )
+        logger.info("EmailService initialized with from_email: %s", self.from_email)
+
+    async def aclose(self) -> None:
+        """Close the HTTP connection pool"""
+        await self._client.aclose()
+
+    async def _post_mail(self, payload: Dict[str, Any]) -> httpx.Response:
+        """POST a mail/send payload, raising HTTPStatusError once retries are exhausted"""
+        # Encode to UTF-8 JSON once; retries resend the same bytes
+        body = orjson.dumps(payload)
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(SENDGRID_MAX_ATTEMPTS),
+            wait=wait_exponential_jitter(initial=0.2, max=2),
+            retry=retry_if_exception(is_retryable_send_error),
+            before_sleep=before_sleep_log(logger, logging.WARNING),
+            reraise=True
+        ):
+            with attempt:
+                # Hold a concurrency slot only for the request itself, not the backoff sleep
+                async with send_gate:
+                    response = await self._client.post(SENDGRID_SEND_URL, content=body)
+                response.raise_for_status()
+        return response
 
     async def send_email(
         self,
@@ -51,28 +144,25 @@ class EmailService:
             Dict with success status and response details
         """
         try:
-            # Create the email message
-            message = Mail(
-                from_email=From(self.from_email, "Flint & Flours"),
-                to_emails=To(recipient_email),
-                subject=Subject(subject),
-                html_content=HtmlContent(html_content)
-            )
-            
-            # Add plain text content if provided
+            # Build the v3 mail/send payload; SendGrid wants text/plain first
+            content = []
             if text_content:
-                message.content = [
-                    Content("text/plain", text_content),
-                    Content("text/html", html_content)
-                ]
+                content.append({"type": "text/plain", "value": text_content})
+            content.append({"type": "text/html", "value": html_content})
+            
+            payload = {
+                "personalizations": [{"to": [{"email": recipient_email}]}],
+                "from": self.sender,
+                "subject": subject,
+                "content": content
+            }
             
             # Send the email
-            response = self.sg.send(message)
+            response = await self._post_mail(payload)
             
             logger.info(
-                f"Email sent successfully to {recipient_email} | "
-                f"Subject: {subject} | "
-                f"Status: {response.status_code}"
+                "Email sent successfully to %s | Subject: %s | Status: %s",
+                recipient_email, subject, response.status_code
             )
             
             return {
@@ -83,21 +173,21 @@ class EmailService:
                 "subject": subject
             }
             
-        except HTTPError as e:
-            error_msg = f"SendGrid HTTP Error: {e.status_code} - {e.body}"
-            logger.error(f"Failed to send email to {recipient_email}: {error_msg}")
+        except httpx.HTTPStatusError as e:
+            error_msg = f"SendGrid HTTP Error: {e.response.status_code} - {e.response.text}"
+            logger.error("Failed to send email to %s: %s", recipient_email, error_msg)
             
             return {
                 "success": False,
                 "error": error_msg,
-                "status_code": getattr(e, 'status_code', None),
+                "status_code": e.response.status_code,
                 "recipient": recipient_email,
                 "subject": subject
             }
             
         except Exception as e:
             error_msg = f"Unexpected error: {str(e)}"
-            logger.error(f"Failed to send email to {recipient_email}: {error_msg}")
+            logger.error("Failed to send email to %s: %s", recipient_email, error_msg)
             
             return {
                 "success": False,
@@ -106,58 +196,92 @@ class EmailService:
                 "subject": subject
             }
 
+    async def send_bulk(
+        self,
+        template_name: str,
+        subject: str,
+        recipients: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Send one template to many recipients, up to 1000 per SendGrid request
+        
+        Args:
+            template_name: Email template to render, e.g. "verification.html"
+            subject: Email subject line shared by every recipient
+            recipients: Dicts with an "email" key and a "substitutions" dict of
+                template variables for that recipient
+            
+        Returns:
+            Dict with overall success status and per-batch failures
+        """
+        if not recipients:
+            return {"success": True, "sent": 0, "failed": []}
+        
+        # Render the template once with -name- tags in place of each variable;
+        # SendGrid swaps in every recipient's own values server-side
+        variables = recipients[0]["substitutions"].keys()
+        html_content = template_env.get_template(template_name).render(
+            **{name: f"-{name}-" for name in variables}
+        )
+        
+        sent = 0
+        failed = []
+        for start in range(0, len(recipients), SENDGRID_MAX_PERSONALIZATIONS):
+            batch = recipients[start:start + SENDGRID_MAX_PERSONALIZATIONS]
+            payload = {
+                "personalizations": [
+                    {
+                        "to": [{"email": recipient["email"]}],
+                        # Substituted values are not escaped by SendGrid
+                        "substitutions": {
+                            f"-{name}-": str(escape(value))
+                            for name, value in recipient["substitutions"].items()
+                        }
+                    }
+                    for recipient in batch
+                ],
+                "from": self.sender,
+                "subject": subject,
+                "content": [{"type": "text/html", "value": html_content}]
+            }
+            
+            try:
+                await self._post_mail(payload)
+                sent += len(batch)
+            except Exception as e:
+                logger.error("Failed to send bulk batch of %d emails: %s", len(batch), e)
+                failed.extend(recipient["email"] for recipient in batch)
+        
+        logger.info("Bulk email '%s' sent to %d recipients, %d failed", subject, sent, len(failed))
+        
+        return {
+            "success": not failed,
+            "sent": sent,
+            "failed": failed,
+            "subject": subject
+        }
+
+    async def send_bulk_verification_emails(self, recipients: Dict[str, str], base_url: str) -> Dict[str, Any]:
+        """Send verification links to many recipients, keyed email -> token"""
+        return await self.send_bulk(
+            "verification.html",
+            VERIFICATION_SUBJECT,
+            [
+                {
+                    "email": email,
+                    "substitutions": {"verification_link": f"{base_url}/verify-email?token={token}"}
+                }
+                for email, token in recipients.items()
+            ]
+        )
+
     async def send_verification_email(self, recipient_email: str, verification_token: str, base_url: str) -> Dict[str, Any]:
         """Send email verification link"""
         verification_link = f"{base_url}/verify-email?token={verification_token}"
         
-        subject = "Welcome to Flint & Flours - Verify Your Email"
+        subject = VERIFICATION_SUBJECT
         
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>Email Verification - Flint & Flours</title>
-            <style>
-                body {{ font-family: 'Georgia', serif; color: #3a3a3a; line-height: 1.6; margin: 0; padding: 0; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: #8b5a3c; padding: 30px; text-align: center; border-radius: 10px 10px 0 0; }}
-                .header h1 {{ color: white; margin: 0; font-size: 28px; }}
-                .content {{ background: #fffef9; padding: 40px; border-radius: 0 0 10px 10px; }}
-                .button {{ display: inline-block; background: #8b5a3c; color: white; padding: 15px 30px; text-decoration: none; border-radius: 8px; font-weight: bold; margin: 20px 0; }}
-                .footer {{ text-align: center; margin-top: 30px; color: #7a7a7a; font-size: 14px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>🥖 Flint & Flours</h1>
-                </div>
-                <div class="content">
-                    <h2>Welcome to our artisan bakery family!</h2>
-                    <p>Thank you for joining Flint & Flours. To complete your registration and start exploring our handcrafted breads, pastries, and treats, please verify your email address.</p>
-                    
-                    <p style="text-align: center;">
-                        <a href="{verification_link}" class="button">Verify My Email</a>
-                    </p>
-                    
-                    <p>If the button doesn't work, copy and paste this link into your browser:</p>
-                    <p style="word-break: break-all; color: #8b5a3c;">{verification_link}</p>
-                    
-                    <p>This verification link will expire in 24 hours for security purposes.</p>
-                    
-                    <p>If you didn't create an account with us, please ignore this email.</p>
-                    
-                    <p>Happy baking!<br>The Flint & Flours Team</p>
-                </div>
-                <div class="footer">
-                    <p>© 2024 Flint & Flours - Where tradition meets artistry</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
+        html_content = render_link_email("verification.html", "verification_link", verification_link)
         
         return await self.send_email(recipient_email, subject, html_content)
 
@@ -165,57 +289,9 @@ class EmailService:
         """Send password reset link"""
         reset_link = f"{base_url}/reset-password?token={reset_token}"
         
-        subject = "Reset Your Flint & Flours Password"
+        subject = PASSWORD_RESET_SUBJECT
         
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>Password Reset - Flint & Flours</title>
-            <style>
-                body {{ font-family: 'Georgia', serif; color: #3a3a3a; line-height: 1.6; margin: 0; padding: 0; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: #8b5a3c; padding: 30px; text-align: center; border-radius: 10px 10px 0 0; }}
-                .header h1 {{ color: white; margin: 0; font-size: 28px; }}
-                .content {{ background: #fffef9; padding: 40px; border-radius: 0 0 10px 10px; }}
-                .button {{ display: inline-block; background: #8b5a3c; color: white; padding: 15px 30px; text-decoration: none; border-radius: 8px; font-weight: bold; margin: 20px 0; }}
-                .footer {{ text-align: center; margin-top: 30px; color: #7a7a7a; font-size: 14px; }}
-                .warning {{ background: #fef3cd; padding: 15px; border-radius: 8px; margin: 20px 0; border-left: 4px solid #f59e0b; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>🥖 Flint & Flours</h1>
-                </div>
-                <div class="content">
-                    <h2>Reset Your Password</h2>
-                    <p>We received a request to reset the password for your Flint & Flours account.</p>
-                    
-                    <p style="text-align: center;">
-                        <a href="{reset_link}" class="button">Reset My Password</a>
-                    </p>
-                    
-                    <p>If the button doesn't work, copy and paste this link into your browser:</p>
-                    <p style="word-break: break-all; color: #8b5a3c;">{reset_link}</p>
-                    
-                    <div class="warning">
-                        <strong>⏰ Important:</strong> This password reset link will expire in 1 hour for security purposes.
-                    </div>
-                    
-                    <p>If you didn't request a password reset, please ignore this email. Your password will remain unchanged.</p>
-                    
-                    <p>Stay secure!<br>The Flint & Flours Team</p>
-                </div>
-                <div class="footer">
-                    <p>© 2024 Flint & Flours - Where tradition meets artistry</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
+        html_content = render_link_email("reset.html", "reset_link", reset_link)
         
         return await self.send_email(recipient_email, subject, html_content)
 
@@ -223,152 +299,41 @@ class EmailService:
         """Send order confirmation email"""
         subject = f"Order Confirmation #{order_data.get('order_id', 'N/A')} - Flint & Flours"
         
-        # Build items list
-        items_html = ""
-        for item in order_data.get('items', []):
-            items_html += f"""
-            <tr>
-                <td style="padding: 10px; border-bottom: 1px solid #f5f1eb;">{item.get('name', 'Unknown Item')}</td>
-                <td style="padding: 10px; border-bottom: 1px solid #f5f1eb; text-align: center;">{item.get('quantity', 1)}</td>
-                <td style="padding: 10px; border-bottom: 1px solid #f5f1eb; text-align: right;">{order_data.get('currency', '₹')}{item.get('price', 0)}</td>
-            </tr>
-            """
-        
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>Order Confirmation - Flint & Flours</title>
-            <style>
-                body {{ font-family: 'Georgia', serif; color: #3a3a3a; line-height: 1.6; margin: 0; padding: 0; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: #8b5a3c; padding: 30px; text-align: center; border-radius: 10px 10px 0 0; }}
-                .header h1 {{ color: white; margin: 0; font-size: 28px; }}
-                .content {{ background: #fffef9; padding: 40px; border-radius: 0 0 10px 10px; }}
-                .order-table {{ width: 100%; border-collapse: collapse; margin: 20px 0; }}
-                .order-table th {{ background: #f5f1eb; padding: 15px; text-align: left; }}
-                .order-table td {{ padding: 10px; border-bottom: 1px solid #f5f1eb; }}
-                .total {{ background: #8b5a3c; color: white; font-weight: bold; }}
-                .footer {{ text-align: center; margin-top: 30px; color: #7a7a7a; font-size: 14px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>🥖 Flint & Flours</h1>
-                </div>
-                <div class="content">
-                    <h2>Thank you for your order!</h2>
-                    <p>We're delighted to confirm your order and will begin preparing your artisan baked goods with care.</p>
-                    
-                    <h3>Order Details</h3>
-                    <p><strong>Order ID:</strong> #{order_data.get('order_id', 'N/A')}</p>
-                    <p><strong>Order Date:</strong> {order_data.get('order_date', 'N/A')}</p>
-                    <p><strong>Region:</strong> {order_data.get('region', 'N/A')}</p>
-                    
-                    <table class="order-table">
-                        <thead>
-                            <tr>
-                                <th>Item</th>
-                                <th style="text-align: center;">Quantity</th>
-                                <th style="text-align: right;">Price</th>
-                            </tr>
-                        </thead>
-                        <tbody>
-                            {items_html}
-                            <tr class="total">
-                                <td colspan="2"><strong>Total</strong></td>
-                                <td style="text-align: right;"><strong>{order_data.get('currency', '₹')}{order_data.get('total', 0)}</strong></td>
-                            </tr>
-                        </tbody>
-                    </table>
-                    
-                    <h3>Delivery Information</h3>
-                    <p>We'll send you tracking information once your order ships.</p>
-                    <p>Expected delivery: {order_data.get('expected_delivery', '2-3 business days')}</p>
-                    
-                    <p>Thank you for choosing Flint & Flours. We can't wait for you to enjoy our handcrafted creations!</p>
-                    
-                    <p>Freshly yours,<br>The Flint & Flours Team</p>
-                </div>
-                <div class="footer">
-                    <p>© 2024 Flint & Flours - Where tradition meets artistry</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
+        html_content = template_env.get_template("order.html").render(
+            order_id=order_data.get('order_id', 'N/A'),
+            order_date=order_data.get('order_date', 'N/A'),
+            region=order_data.get('region', 'N/A'),
+            items=order_data.get('items', []),
+            currency=order_data.get('currency', '₹'),
+            total=order_data.get('total', 0),
+            expected_delivery=order_data.get('expected_delivery', '2-3 business days')
+        )
         
         return await self.send_email(recipient_email, subject, html_content)
 
     async def send_shipping_update_email(self, recipient_email: str, tracking_data: Dict[str, Any]) -> Dict[str, Any]:
         """Send shipping tracking update"""
-        subject = f"Your Order is On Its Way! - Flint & Flours"
+        subject = SHIPPING_UPDATE_SUBJECT
         
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>Shipping Update - Flint & Flours</title>
-            <style>
-                body {{ font-family: 'Georgia', serif; color: #3a3a3a; line-height: 1.6; margin: 0; padding: 0; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: #8b5a3c; padding: 30px; text-align: center; border-radius: 10px 10px 0 0; }}
-                .header h1 {{ color: white; margin: 0; font-size: 28px; }}
-                .content {{ background: #fffef9; padding: 40px; border-radius: 0 0 10px 10px; }}
-                .tracking-box {{ background: #f5f1eb; padding: 20px; border-radius: 8px; margin: 20px 0; text-align: center; }}
-                .tracking-number {{ font-size: 18px; font-weight: bold; color: #8b5a3c; }}
-                .button {{ display: inline-block; background: #8b5a3c; color: white; padding: 15px 30px; text-decoration: none; border-radius: 8px; font-weight: bold; margin: 20px 0; }}
-                .footer {{ text-align: center; margin-top: 30px; color: #7a7a7a; font-size: 14px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>🚚 Your Order is Shipped!</h1>
-                </div>
-                <div class="content">
-                    <h2>Great news! Your order is on its way</h2>
-                    <p>Your Flint & Flours order #{tracking_data.get('order_id', 'N/A')} has been shipped and is heading to your doorstep.</p>
-                    
-                    <div class="tracking-box">
-                        <p><strong>Tracking Number:</strong></p>
-                        <div class="tracking-number">{tracking_data.get('tracking_number', 'N/A')}</div>
-                    </div>
-                    
-                    <p style="text-align: center;">
-                        <a href="{tracking_data.get('tracking_link', '#')}" class="button">Track Your Order</a>
-                    </p>
-                    
-                    <p><strong>Expected Delivery:</strong> {tracking_data.get('expected_delivery', '2-3 business days')}</p>
-                    
-                    <p>We've carefully packaged your artisan baked goods to ensure they arrive fresh and delicious.</p>
-                    
-                    <p>Thank you for your order!<br>The Flint & Flours Team</p>
-                </div>
-                <div class="footer">
-                    <p>© 2024 Flint & Flours - Where tradition meets artistry</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
+        html_content = template_env.get_template("shipping.html").render(
+            order_id=tracking_data.get('order_id', 'N/A'),
+            tracking_number=tracking_data.get('tracking_number', 'N/A'),
+            tracking_link=tracking_data.get('tracking_link', '#'),
+            expected_delivery=tracking_data.get('expected_delivery', '2-3 business days')
+        )
         
         return await self.send_email(recipient_email, subject, html_content)
 
-# Global email service instance
-email_service = None
-
+# Single shared email service instance, created on first use
+@lru_cache(maxsize=1)
 def get_email_service() -> EmailService:
     """Get or create the email service instance"""
-    global email_service
-    if email_service is None:
-        email_service = EmailService()
-    return email_service
+    return EmailService()
+
+async def close_email_service() -> None:
+    """Close the email service's HTTP client if the service was created"""
+    if get_email_service.cache_info().currsize:
+        await get_email_service().aclose()
 
 # Convenience functions for common email types
 async def send_verification_email(recipient_email: str, verification_token: str, base_url: str = "https://flintandflours.com") -> Dict[str, Any]:
@@ -376,6 +341,11 @@ async def send_verification_email(recipient_email: str, verification_token: str,
     service = get_email_service()
     return await service.send_verification_email(recipient_email, verification_token, base_url)
 
+async def send_bulk_verification_emails(recipients: Dict[str, str], base_url: str = "https://flintandflours.com") -> Dict[str, Any]:
+    """Send verification emails to many recipients in batched requests"""
+    service = get_email_service()
+    return await service.send_bulk_verification_emails(recipients, base_url)
+
 async def send_password_reset_email(recipient_email: str, reset_token: str, base_url: str = "https://flintandflours.com") -> Dict[str, Any]:
     """Send password reset email"""
     service = get_email_service()
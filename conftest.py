@@ -0,0 +1,156 @@
+"""
+Shared fixtures for the Flint & Flours backend API tests
+Session-scoped, so each xdist worker builds them once and reuses them
+"""
+
+import asyncio
+import os
+import uuid
+from functools import lru_cache
+
+import httpx
+import orjson
+import pytest
+import pytest_asyncio
+
+FRONTEND_ENV_PATH = '/app/frontend/.env'
+
+# Bound every call so a hung backend fails the run instead of stalling it
+REQUEST_TIMEOUT = 10
+
+# Reuse one account across runs instead of paying for registration every time
+REUSE_TEST_EMAIL = os.environ.get("REUSE_TEST_EMAIL")
+
+def use_orjson(response: httpx.Response):
+    """Decode this response's .json() with orjson. Only the test clients' own
+    responses get this; each call still returns a fresh object."""
+    decode_json = response.json
+    
+    def response_json(**kwargs):
+        if kwargs:
+            return decode_json(**kwargs)
+        return orjson.loads(response.content)
+    
+    response.json = response_json
+
+async def use_orjson_async(response: httpx.Response):
+    use_orjson(response)
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--backend-url",
+        default=None,
+        help="Backend base URL to test against (defaults to REACT_APP_BACKEND_URL from the frontend .env)"
+    )
+
+@lru_cache(maxsize=1)
+def read_backend_url() -> str:
+    """Read the backend URL from the frontend .env file"""
+    with open(FRONTEND_ENV_PATH, 'r') as f:
+        for line in f:
+            if line.startswith('REACT_APP_BACKEND_URL='):
+                return line.strip().split('=')[1]
+    raise RuntimeError(f"REACT_APP_BACKEND_URL not set in {FRONTEND_ENV_PATH}")
+
+@pytest.fixture(scope="session")
+def api_url(request):
+    backend_url = request.config.getoption("--backend-url") or read_backend_url()
+    return f"{backend_url.rstrip('/')}/api"
+
+@pytest.fixture(scope="session")
+def client():
+    """One HTTP/2 client per worker for the sequential tests, reusing a kept-alive connection"""
+    with httpx.Client(
+        http2=True,
+        timeout=REQUEST_TIMEOUT,
+        limits=httpx.Limits(max_keepalive_connections=10, max_connections=10),
+        headers={"User-Agent": "flint-tests/1.0"},
+        follow_redirects=True,
+        event_hooks={"response": [use_orjson]}
+    ) as http_client:
+        yield http_client
+
+@pytest.fixture(scope="session", autouse=True)
+def warm_backend(client, api_url):
+    """Wake the backend and open the pooled connection before the first test"""
+    try:
+        client.get(f"{api_url}/health")
+    except httpx.HTTPError:
+        # An unreachable backend is reported by the tests themselves
+        pass
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def async_client():
+    """Async HTTP/2 client for tests that fan out independent requests on one event loop"""
+    async with httpx.AsyncClient(
+        http2=True,
+        timeout=REQUEST_TIMEOUT,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=20, keepalive_expiry=60),
+        headers={"User-Agent": "flint-tests/1.0"},
+        follow_redirects=True,
+        event_hooks={"response": [use_orjson_async]}
+    ) as http_client:
+        yield http_client
+
+@pytest.fixture(scope="session")
+def test_email():
+    """REUSE_TEST_EMAIL if set, otherwise a fresh address so runs never collide on registration"""
+    return REUSE_TEST_EMAIL or f"test.user.{uuid.uuid4()}@example.com"
+
+@pytest.fixture(scope="session")
+def test_password():
+    return "SecurePassword123"
+
+@pytest.fixture(scope="session")
+def test_account(client, api_url, test_email, test_password):
+    """The test user's profile and tokens, registering the user only when needed"""
+    credentials = {
+        "email": test_email,
+        "password": test_password
+    }
+    
+    if REUSE_TEST_EMAIL:
+        response = client.post(f"{api_url}/auth/login", json=credentials)
+        if response.status_code == 200:
+            tokens = response.json()
+            # An earlier run's profile tests leave the region at Canada; start from India again
+            response = client.put(
+                f"{api_url}/user/profile",
+                headers={"Authorization": f"Bearer {tokens['access_token']}"},
+                json={"region": "India"}
+            )
+            assert response.status_code == 200, response.text
+            return response.json(), tokens
+    
+    response = client.post(f"{api_url}/auth/register", json={**credentials, "region": "India"})
+    assert response.status_code == 200, response.text
+    user = response.json()
+    
+    response = client.post(f"{api_url}/auth/login", json=credentials)
+    assert response.status_code == 200, response.text
+    return user, response.json()
+
+@pytest.fixture(scope="session")
+def registered_user(test_account):
+    """The test user, registered in the India region"""
+    return test_account[0]
+
+@pytest.fixture(scope="session")
+def auth_tokens(test_account):
+    """The test user's access/refresh token pair"""
+    return test_account[1]
+
+@pytest.fixture(scope="session")
+def products_response(client, api_url):
+    """GET /products for the default region, fetched once per worker"""
+    return client.get(f"{api_url}/products")
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def products_by_region(async_client, api_url):
+    """GET /products for each supported region, fetched concurrently once per worker"""
+    regions = ("India", "Canada")
+    responses = await asyncio.gather(*(
+        async_client.get(f"{api_url}/products", params={"region": region})
+        for region in regions
+    ))
+    return dict(zip(regions, responses))